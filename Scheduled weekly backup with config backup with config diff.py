@@ -22,20 +22,43 @@ Parameters:
     - tftp_server_vrf: VRF to reach the TFTP server (default: mgmt)
     - tftp_configuration_format: Format for backup (cli or json, default: json)
     - file_name_prefix: Prefix for backup filename (timestamp will be appended)
+    - tftp_blocksize: TFTP block size in bytes (0 uses the copy command default)
+    - compress_backup: Gzip the backup before sending it (true/false, default: false)
     - backup_day_of_week: Day of week for weekly backup (Monday, Tuesday, etc.)
     - backup_time: Time of day for weekly backup in HH:MM:SS format
     - enable_weekly_backup: Enable/disable weekly scheduled backups (true/false)
     - enable_change_backup: Enable/disable config change backups (true/false)
+    - config_poll_interval: How often the configuration time is polled (default: 30 seconds)
+    - change_backup_mode: Config change backups as full configs or diffs (full or diff)
 """
 
+import itertools
+import re
+import shlex
 import time
-from datetime import datetime
-from re import sub
+from datetime import datetime, timedelta
+
+# Map day names to numbers (0=Monday, 6=Sunday)
+DAY_MAP = {
+    'monday': 0,
+    'tuesday': 1,
+    'wednesday': 2,
+    'thursday': 3,
+    'friday': 4,
+    'saturday': 5,
+    'sunday': 6
+}
+
+# Time of day in HH:MM:SS (24-hour) format
+_TIME_RE = re.compile(r'\A(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]\Z')
+
+# Monitor interval such as '30 seconds' or '1 minutes'
+_INTERVAL_RE = re.compile(r'\A[1-9][0-9]* (?:seconds|minutes)\Z')
 
 Manifest = {
     'Name': 'combined_tftp_backup',
     'Description': 'Backs up switch configuration to TFTP on weekly schedule and config changes',
-    'Version': '1.7',
+    'Version': '1.11',
     'Author': 'Matthew Stegink',
     'AOSCXVersionMin': '10.08',
     'AOSCXPlatformList': ['8320', '8325', '8400', '6300', '6200', '6400']
@@ -66,6 +89,22 @@ ParameterDefinitions = {
         'Type': 'string',
         'Default': 'switch-backup-'
     },
+    'tftp_blocksize': {
+        'Name': 'TFTP Block Size',
+        'Description': 'TFTP block size in bytes (512-65464) negotiated with the server; '
+                       'larger blocks need fewer round trips on high-latency links. '
+                       '0 uses the copy command, which always sends 512 byte blocks',
+        'Type': 'string',
+        'Default': '0'
+    },
+    'compress_backup': {
+        'Name': 'Compress Backup',
+        'Description': 'Gzip the backup before sending it (true or false). Fewer TFTP blocks '
+                       'means fewer round trips on high-latency links; the file gets a .gz '
+                       'extension',
+        'Type': 'string',
+        'Default': 'false'
+    },
     'backup_day_of_week': {
         'Name': 'Weekly Backup Day',
         'Description': 'Day of week for weekly backup (Monday, Tuesday, Wednesday, Thursday, Friday, Saturday, Sunday)',
@@ -80,19 +119,149 @@ ParameterDefinitions = {
     },
     'enable_weekly_backup': {
         'Name': 'Enable Weekly Backup',
-        'Description': 'Enable or disable weekly scheduled backups (true or false)',
+        'Description': 'Enable or disable weekly scheduled backups (true or false). '
+                       'Enabling requires an agent restart',
         'Type': 'string',
         'Default': 'true'
     },
     'enable_change_backup': {
         'Name': 'Enable Config Change Backup',
-        'Description': 'Enable or disable backups on configuration changes (true or false)',
+        'Description': 'Enable or disable backups on configuration changes (true or false). '
+                       'Enabling requires an agent restart',
         'Type': 'string',
         'Default': 'true'
+    },
+    'config_poll_interval': {
+        'Name': 'Config Change Poll Interval',
+        'Description': 'Interval over which the last configuration time is monitored '
+                       '(e.g. 30 seconds). Longer intervals mean less REST polling but '
+                       'configuration changes are detected later',
+        'Type': 'string',
+        'Default': '30 seconds'
+    },
+    'change_backup_mode': {
+        'Name': 'Config Change Backup Mode',
+        'Description': 'Back up the full configuration (full) or only the checkpoint diff (diff) '
+                       'on configuration changes. Weekly backups are always full',
+        'Type': 'string',
+        'Default': 'full'
     }
 }
 
 
+# Helpers shared by the TFTP backup scripts. NAE scripts are uploaded as
+# single files and cannot import each other, so keep these identical in
+# every backup script.
+
+def is_valid_time(time_str):
+    """
+    Validate time string is in HH:MM:SS format.
+    
+    :param time_str: Time string to validate
+    :return: True if valid, False otherwise
+    """
+    return _TIME_RE.match(time_str) is not None
+
+
+def timestamped_filename(file_prefix, tag, file_extension, sequence=None):
+    """
+    Build a timestamped backup filename.
+    
+    :param file_prefix: Prefix for the backup filename
+    :param tag: Text inserted between the prefix and the timestamp
+    :param file_extension: Extension appended after the timestamp (e.g. .json)
+    :param sequence: Optional number appended to the timestamp, keeping
+                     filenames of backups taken in the same second unique
+    :return: Filename such as <prefix><tag><timestamp>[-<sequence>].json
+    """
+    timestamp = int(time.time())
+    if sequence is not None:
+        return f"{file_prefix}{tag}{timestamp}-{sequence}{file_extension}"
+    return f"{file_prefix}{tag}{timestamp}{file_extension}"
+
+
+def build_tftp_command(tftp_server, filename, config_format, vrf, blocksize, compress):
+    """
+    Build the command that copies the running configuration to TFTP.
+    
+    :param tftp_server: IP address or hostname of TFTP server
+    :param filename: Backup filename on the TFTP server
+    :param config_format: Format for backup (json or cli)
+    :param vrf: VRF name to reach the TFTP server
+    :param blocksize: TFTP block size in bytes, 0 for the copy command default
+    :param compress: True to gzip the configuration before sending it
+    :return: Tuple of (command, True if it is a shell command, False if CLI)
+    """
+    if blocksize or compress:
+        # The copy command can neither negotiate the block size (RFC 2348)
+        # nor compress, so stream the configuration to the server with curl
+        show_command = 'show running-config json' if config_format == 'json' else 'show running-config'
+        return stream_to_tftp(f'vtysh -c "{show_command}"', tftp_server, filename, vrf,
+                              blocksize, compress), True
+    
+    tftp_command = f'copy running-config tftp://{tftp_server}/{filename} {config_format}'
+    
+    if vrf:
+        tftp_command += f' vrf {vrf}'
+    
+    return tftp_command, False
+
+
+def stream_to_tftp(source_cmd, tftp_server, filename, vrf, blocksize, compress):
+    """
+    Build a shell command that uploads the output of a command to TFTP.
+    
+    :param source_cmd: Shell command writing the backup contents to standard output
+    :param tftp_server: IP address or hostname of TFTP server
+    :param filename: Backup filename on the TFTP server
+    :param vrf: VRF name to reach the TFTP server
+    :param blocksize: TFTP block size in bytes, 0 for the curl default
+    :param compress: True to gzip the output before sending it
+    :return: Shell command piping the output of source_cmd to the server
+    """
+    command = f'{source_cmd} | '
+    
+    if compress:
+        # Fastest level keeps CPU usage low on smaller platforms
+        command += 'gzip -1 | '
+    
+    return command + curl_tftp_upload(tftp_server, filename, vrf, blocksize)
+
+
+def curl_tftp_upload(tftp_server, filename, vrf, blocksize):
+    """
+    Build a shell command that uploads its standard input to TFTP with curl.
+    
+    :param tftp_server: IP address or hostname of TFTP server
+    :param filename: Backup filename on the TFTP server
+    :param vrf: VRF name to reach the TFTP server
+    :param blocksize: TFTP block size in bytes, 0 for the curl default
+    :return: Shell command reading the file contents from standard input
+    """
+    command = f'{netns_prefix(vrf)}curl -s -S '
+    
+    if blocksize:
+        command += f'--tftp-blksize {blocksize} '
+    
+    # Parameter values are quoted so they cannot break out of the command
+    return command + '-T - ' + shlex.quote(f'tftp://{tftp_server}/{filename}')
+
+
+def netns_prefix(vrf):
+    """
+    Build the shell prefix that runs a command inside a VRF.
+    
+    :param vrf: VRF name to reach the TFTP server
+    :return: 'ip netns exec' prefix, or an empty string if no VRF is set
+    """
+    if not vrf:
+        return ''
+    
+    # The default VRF lives in the switch namespace
+    namespace = 'swns' if vrf == 'default' else vrf
+    return f'ip netns exec {shlex.quote(namespace)} '
+
+
 class Agent(NAE):
     """
     NAE Agent for combined weekly scheduled and config change TFTP backups.
@@ -101,39 +270,81 @@ class Agent(NAE):
     1. Weekly backups on a scheduled day/time
     2. Automatic backups when configuration changes are detected
     
-    Both can be independently enabled or disabled via parameters.
+    Both can be independently enabled or disabled via parameters. The rules
+    of a mechanism that is disabled when the agent starts are not created,
+    so enabling it later requires restarting the agent.
     """
     
-    # Map day names to numbers (0=Monday, 6=Sunday)
-    DAY_MAP = {
-        'monday': 0,
-        'tuesday': 1,
-        'wednesday': 2,
-        'thursday': 3,
-        'friday': 4,
-        'saturday': 5,
-        'sunday': 6
-    }
+    # Interval between two weekly backups
+    BACKUP_INTERVAL = timedelta(days=7)
     
     def __init__(self):
         """Initialize the combined backup agent."""
         
-        # Weekly scheduled backup rule - checks every 60 seconds
-        self.schedule_rule = Rule('Weekly Backup Check')
-        self.schedule_rule.condition('every 60 seconds')
-        self.schedule_rule.action(self.check_weekly_backup_schedule)
+        # Normalize the parameters once rather than on every backup
+        self._reload_config_params()
+        
+        # Checkpoint stored at the start of a change burst, used as the diff
+        # base. It is only needed until the burst's backup, so it is kept in
+        # memory rather than in self.variables
+        self._base_checkpoint = None
+        
+        # Checkpoint list URL, built once
+        self._configlist_url = HTTP_ADDRESS + '/rest/configlist'
         
-        # Configuration change monitoring
-        uri = '/rest/v1/system?attributes=last_configuration_time'
-        rate_uri = Rate(uri, '10 seconds')
-        self.monitor = Monitor(rate_uri, 'Rate of last configuration time')
+        # Config change backups are deferred until no further change has
+        # completed for this many seconds, so a burst of changes results in
+        # a single backup
+        self._pending_debounce = 30
+        self._pending_backup_deadline = None
+        
+        # Sequence number appended to backup filenames, since a weekly and a
+        # config change backup can be issued within the same second
+        self._seq = itertools.count()
+        
+        # Rules and monitors of a disabled backup mechanism are not created at
+        # all, so it costs nothing; enabling it requires an agent restart
+        self._weekly_rules_active = self._cfg['weekly_enabled']
+        self._change_rules_active = self._cfg['change_enabled']
+        
+        if self._weekly_rules_active:
+            # Parse the weekly schedule once and compute the next backup time
+            self._reload_schedule_params()
+            
+            # Weekly scheduled backup rule - checks every 60 seconds whether the
+            # precomputed backup time has been reached
+            self.schedule_rule = Rule('Weekly Backup Check')
+            self.schedule_rule.condition('every 60 seconds')
+            self.schedule_rule.action(self.check_weekly_backup_schedule)
+        else:
+            self._set_next_backup_time(None)
+            self.logger.info("Weekly backup disabled")
         
-        # Config change detection rule
-        self.config_change_rule = Rule('Configuration change detection')
-        self.config_change_rule.condition('{} > 0', [self.monitor])
-        self.config_change_rule.action(self.store_base_checkpoint)
-        self.config_change_rule.clear_condition('{} == 0', [self.monitor])
-        self.config_change_rule.clear_action(self.handle_config_change)
+        if self._change_rules_active:
+            # Configuration change monitoring
+            poll_interval = str(self.params['config_poll_interval']).strip().lower()
+            if not _INTERVAL_RE.match(poll_interval):
+                self.logger.warning(f"Invalid poll interval '{poll_interval}', using '30 seconds'")
+                poll_interval = '30 seconds'
+            
+            uri = '/rest/v1/system?attributes=last_configuration_time'
+            rate_uri = Rate(uri, poll_interval)
+            self.monitor = Monitor(rate_uri, 'Rate of last configuration time')
+            
+            # Config change detection rule
+            self.config_change_rule = Rule('Configuration change detection')
+            self.config_change_rule.condition('{} > 0', [self.monitor])
+            self.config_change_rule.action(self.store_base_checkpoint)
+            self.config_change_rule.clear_condition('{} == 0', [self.monitor])
+            self.config_change_rule.clear_action(self.handle_config_change)
+            
+            # Pending backup rule - checks every 10 seconds whether the deferred
+            # config change backup is due
+            self.pending_backup_rule = Rule('Pending backup check')
+            self.pending_backup_rule.condition('every 10 seconds')
+            self.pending_backup_rule.action(self.process_pending_backups)
+        else:
+            self.logger.info("Config change backup disabled")
         
         self.logger.info("Combined TFTP Backup Agent initialized")
 
@@ -142,67 +353,205 @@ class Agent(NAE):
         Check if it's time to run the weekly backup.
         
         This method is called every 60 seconds. It checks if weekly backups
-        are enabled, if today is the scheduled day, if the current time has 
-        passed the scheduled backup time, and if a backup hasn't already been 
-        performed this week.
+        are enabled and compares the current Unix time against the precomputed
+        next backup timestamp; the scheduled day and time are parsed once at
+        startup. After a backup the next backup time is advanced by one week
+        from the scheduled time itself, so late checks never make the
+        schedule drift.
         
         :param event: Event details passed by the NAE agent
         """
         try:
             # Check if weekly backup is enabled
-            weekly_enabled = str(self.params['enable_weekly_backup']).strip().lower()
-            if weekly_enabled != 'true':
+            if not self._cfg['weekly_enabled']:
                 return
             
-            current_datetime = datetime.now()
-            current_time = current_datetime.strftime("%H:%M:%S")
-            current_day = current_datetime.weekday()  # 0=Monday, 6=Sunday
-            current_week = current_datetime.strftime('%Y-W%U')  # Year-Week number
-            
-            # Get and validate scheduled day
-            scheduled_day_name = str(self.params['backup_day_of_week']).strip().lower()
-            if scheduled_day_name not in self.DAY_MAP:
-                self.logger.error(f"Invalid day: {scheduled_day_name}. Use Monday-Sunday")
+            if self._next_backup_ts is None or time.time() < self._next_backup_ts:
                 return
             
-            scheduled_day = self.DAY_MAP[scheduled_day_name]
-            
-            # Get and validate scheduled time
-            scheduled_time = str(self.params['backup_time']).strip()
-            if not self._is_valid_time_format(scheduled_time):
-                self.logger.error(f"Invalid time format: {scheduled_time}. Use HH:MM:SS")
-                return
+            current_datetime = datetime.now()
+            backup_time = self.next_backup_time
             
-            # Check if backup already ran this week
-            last_backup_week = self.variables.get('last_backup_week', '')
+            # Advance to the next slot in the future, skipping any slots that
+            # were missed (e.g. after a clock change)
+            next_backup_time = backup_time
+            while next_backup_time <= current_datetime:
+                next_backup_time += self.BACKUP_INTERVAL
+            self._set_next_backup_time(next_backup_time)
             
-            # If today is the scheduled day, time has passed, and we haven't backed up this week
-            if (current_day == scheduled_day and 
-                current_time >= scheduled_time and 
-                last_backup_week != current_week):
-                
-                day_name = scheduled_day_name.capitalize()
-                self.logger.info(f"Weekly backup triggered on {day_name} at {current_time}")
-                self.perform_backup('weekly_scheduled')
-                self.variables['last_backup_week'] = current_week
+            day_name = backup_time.strftime('%A')
+            current_time = current_datetime.strftime("%H:%M:%S")
+            self.logger.info(f"Weekly backup triggered on {day_name} at {current_time}")
+            self.perform_backup('weekly_scheduled')
+            self.variables['last_backup_week'] = str(self._backup_week(backup_time))
                 
         except Exception as e:
             self.logger.error(f"Error in check_weekly_backup_schedule: {e}")
 
+    def on_parameter_change(self, params):
+        """
+        Re-parse the parameters and weekly schedule when they are edited.
+        
+        :param params: Changed parameters passed by the NAE agent
+        """
+        self.logger.info("Parameters changed, reloading configuration")
+        self._reload_config_params()
+        
+        if self._cfg['weekly_enabled']:
+            if self._weekly_rules_active:
+                self._reload_schedule_params()
+            else:
+                self.logger.warning("Weekly backup enabled, restart the agent to schedule it")
+        
+        if self._cfg['change_enabled'] and not self._change_rules_active:
+            self.logger.warning("Config change backup enabled, restart the agent to monitor changes")
+
+    def _reload_config_params(self):
+        """
+        Normalize and cache the backup parameters in self._cfg.
+        
+        Invalid values are replaced by their defaults with a warning; a
+        missing TFTP server or filename prefix is reported when a backup
+        is attempted.
+        """
+        # Get and validate format
+        config_format = str(self.params['tftp_configuration_format']).strip().lower()
+        if config_format not in ('json', 'cli'):
+            self.logger.warning(f"Invalid format '{config_format}', using 'json'")
+            config_format = 'json'
+        
+        # Get and validate TFTP block size
+        blocksize = str(self.params['tftp_blocksize']).strip()
+        if not blocksize.isdigit() or not (int(blocksize) == 0 or 512 <= int(blocksize) <= 65464):
+            self.logger.warning(f"Invalid TFTP block size '{blocksize}', using default")
+            blocksize = '0'
+        
+        # Get and validate change backup mode
+        change_backup_mode = str(self.params['change_backup_mode']).strip().lower()
+        if change_backup_mode not in ('full', 'diff'):
+            self.logger.warning(f"Invalid change backup mode '{change_backup_mode}', using 'full'")
+            change_backup_mode = 'full'
+        
+        self._cfg = {
+            'tftp_server': str(self.params['tftp_server_address']).strip(),
+            'vrf': str(self.params['tftp_server_vrf']).strip(),
+            'fmt': config_format,
+            'prefix': str(self.params['file_name_prefix']).strip(),
+            'blocksize': int(blocksize),
+            'compress': str(self.params['compress_backup']).strip().lower() == 'true',
+            'weekly_enabled': str(self.params['enable_weekly_backup']).strip().lower() == 'true',
+            'change_enabled': str(self.params['enable_change_backup']).strip().lower() == 'true',
+            'change_backup_mode': change_backup_mode
+        }
+
+    def _reload_schedule_params(self):
+        """
+        Parse and cache the weekly schedule parameters.
+        
+        The scheduled weekday and the scheduled time as seconds of the day
+        are cached so the periodic check never touches the parameters. If
+        either parameter is invalid the weekly backup is disabled until the
+        parameters are corrected.
+        """
+        self._sched_weekday = None
+        self._sched_sod = None
+        self._set_next_backup_time(None)
+        
+        # Get and validate scheduled day
+        scheduled_day_name = str(self.params['backup_day_of_week']).strip().lower()
+        if scheduled_day_name not in DAY_MAP:
+            self.logger.error(f"Invalid day: {scheduled_day_name}. Use Monday-Sunday")
+            return
+        
+        # Get and validate scheduled time
+        scheduled_time = str(self.params['backup_time']).strip()
+        if not is_valid_time(scheduled_time):
+            self.logger.error(f"Invalid time format: {scheduled_time}. Use HH:MM:SS")
+            return
+        
+        hour, minute, second = map(int, scheduled_time.split(':'))
+        
+        self._sched_weekday = DAY_MAP[scheduled_day_name]
+        self._sched_sod = hour * 3600 + minute * 60 + second
+        self._set_next_backup_time(self._compute_first_backup_time())
+        self.logger.info(f"Next weekly backup scheduled for {self.next_backup_time}")
+
+    def _set_next_backup_time(self, next_backup_time):
+        """
+        Set the next backup time.
+        
+        The time is also kept as a Unix timestamp so the periodic check only
+        needs time.time() instead of building a datetime on every call.
+        Slots are advanced on the local datetime, keeping the wall-clock time
+        stable across daylight saving changes.
+        
+        :param next_backup_time: datetime of the next backup, or None
+        """
+        self.next_backup_time = next_backup_time
+        if next_backup_time is None:
+            self._next_backup_ts = None
+        else:
+            self._next_backup_ts = time.mktime(next_backup_time.timetuple())
+
+    def _compute_first_backup_time(self):
+        """
+        Compute the first backup time from the cached schedule.
+        
+        If today is the scheduled day and the scheduled time has already
+        passed without a backup this week, the backup is due immediately.
+        
+        :return: datetime of the next backup
+        """
+        current_datetime = datetime.now()
+        days_ahead = (self._sched_weekday - current_datetime.weekday()) % 7
+        midnight = current_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
+        next_backup_time = midnight + timedelta(days=days_ahead, seconds=self._sched_sod)
+        
+        # Scheduled time already passed today - only run it if this week's
+        # backup hasn't been performed yet (e.g. agent restarted)
+        if next_backup_time <= current_datetime:
+            last_backup_week = self.variables.get('last_backup_week', '')
+            if last_backup_week.isdigit():
+                already_done = int(last_backup_week) == self._backup_week(next_backup_time)
+            else:
+                # Week marker written by a previous version of this script
+                already_done = last_backup_week == next_backup_time.strftime('%Y-W%U')
+            if already_done:
+                next_backup_time += self.BACKUP_INTERVAL
+        
+        return next_backup_time
+
+    def _backup_week(self, backup_time):
+        """
+        Get the ISO week of a backup time packed as an integer.
+        
+        :param backup_time: datetime of the backup
+        :return: Year and ISO week number as YYYYWW (e.g. 202641)
+        """
+        year, week, _ = backup_time.isocalendar()
+        return year * 100 + week
+
     def store_base_checkpoint(self, event):
         """
         Store the base configuration checkpoint when a change is detected.
         
         This callback is triggered when configuration changes start. It stores
-        the last checkpoint to use as a reference for calculating diffs.
+        the last checkpoint to use as a reference for calculating diffs. While
+        a config change backup is pending, the checkpoint stored at the start
+        of the burst is kept so the diff covers every change in the burst.
+        A pending backup whose debounce timer already expired belongs to the
+        previous burst, so it is run before the new checkpoint is stored.
         
         :param event: Event details passed by the NAE agent
         """
         try:
-            uri = '/rest/configlist'
-            configlist = self.get_rest_request_json(HTTP_ADDRESS + uri)
+            self._run_due_change_backup()
+            if self._pending_backup_deadline is not None:
+                return
+            
+            configlist = self.get_rest_request_json(self._configlist_url)
             if configlist:
-                self.variables['base_checkpoint'] = configlist[-1]['name']
+                self._base_checkpoint = configlist[-1]['name']
                 self.logger.debug(f"Stored base checkpoint: {configlist[-1]['name']}")
         except Exception as e:
             self.logger.error(f"Could not get checkpoint list: {e}")
@@ -212,47 +561,101 @@ class Agent(NAE):
         Handle configuration change completion.
         
         This callback is triggered when configuration changes are complete 
-        (rate returns to zero). It logs the change, shows diffs, and triggers
-        a backup if config change backups are enabled.
+        (rate returns to zero). If config change backups are enabled, it
+        (re)starts the debounce timer; the diff and backup are performed by
+        _do_change_backup once no further change completes in the meantime.
         
         :param event: Event details passed by the NAE agent
         """
         try:
             # Check if config change backup is enabled
-            change_enabled = str(self.params['enable_change_backup']).strip().lower()
-            if change_enabled != 'true':
+            if not self._cfg['change_enabled']:
                 return
             
-            # Get base checkpoint for diff
-            if 'base_checkpoint' in self.variables:
-                base_checkpoint = self.variables['base_checkpoint']
-            else:
-                base_checkpoint = 'startup-config'
-            
-            # Log the configuration change
-            ActionSyslog('Configuration change detected - backup initiated')
-            ActionCLI('show system', title=Title("System information"))
-            
-            # Show configuration differences
-            ActionCLI(f'checkpoint diff {base_checkpoint} running-config',
-                      title=Title("Configuration changes since latest checkpoint"))
-            
-            if base_checkpoint != 'startup-config':
-                ActionCLI('checkpoint diff startup-config running-config',
-                          title=Title("Unsaved configuration changes"))
-            
-            # Show audit logs
-            ActionShell('ausearch -i -m USYS_CONFIG -ts recent',
-                        title=Title("Recent audit logs for configuration changes"))
-            
-            # Perform backup
-            self.logger.info("Configuration change backup triggered")
-            self.perform_backup('config_change')
+            self._pending_backup_deadline = time.time() + self._pending_debounce
+            self.logger.debug(f"Config change backup deferred by {self._pending_debounce} seconds")
             
         except Exception as e:
             self.logger.error(f"Error in handle_config_change: {e}")
 
-    def perform_backup(self, backup_type):
+    def process_pending_backups(self, event):
+        """
+        Run the deferred config change backup once it is due.
+        
+        This method is called every 10 seconds. It starts the config change
+        backup once its debounce timer expires.
+        
+        :param event: Event details passed by the NAE agent
+        """
+        try:
+            self._run_due_change_backup()
+            
+        except Exception as e:
+            self.logger.error(f"Error in process_pending_backups: {e}")
+
+    def _run_due_change_backup(self):
+        """
+        Run the deferred config change backup if its debounce timer expired.
+        """
+        if (self._pending_backup_deadline is not None and
+            time.time() >= self._pending_backup_deadline):
+            self._pending_backup_deadline = None
+            self._do_change_backup()
+
+    def _do_change_backup(self):
+        """
+        Log the configuration differences and back up the changed configuration.
+        """
+        # Get base checkpoint for diff; it belongs to this burst only, so the
+        # next burst must store a fresh one
+        stored_checkpoint = self._base_checkpoint
+        self._base_checkpoint = None
+        base_checkpoint = stored_checkpoint or 'startup-config'
+        
+        # Log the configuration change
+        ActionSyslog('Configuration change detected - backup initiated')
+        
+        # Show configuration differences and audit logs in a single shell
+        # rather than spawning one CLI session per command
+        base_diff = 'vtysh -c ' + shlex.quote(f'checkpoint diff {base_checkpoint} running-config')
+        
+        base_header = 'echo "Configuration changes since latest checkpoint:"'
+        
+        if base_checkpoint == 'startup-config':
+            diff_commands = f'{base_header}; {base_diff}'
+        else:
+            unsaved_diff = 'vtysh -c "checkpoint diff startup-config running-config"'
+            unsaved_header = 'echo "Unsaved configuration changes:"'
+            # The diffs are independent, so run them concurrently and buffer
+            # their output to keep it from interleaving; if no temporary
+            # directory can be created, run them one after the other instead
+            diff_commands = (
+                'if tmp=$(mktemp -d); then '
+                f'{base_diff} > "$tmp/base" & '
+                f'{unsaved_diff} > "$tmp/unsaved" & '
+                'wait; '
+                f'{base_header}; cat "$tmp/base"; '
+                f'{unsaved_header}; cat "$tmp/unsaved"; '
+                'rm -rf "$tmp"; '
+                'else '
+                f'{base_header}; {base_diff}; '
+                f'{unsaved_header}; {unsaved_diff}; '
+                'fi'
+            )
+        
+        ActionShell(f'{diff_commands}; '
+                    'echo "Recent audit logs for configuration changes:"; '
+                    'ausearch -i -m USYS_CONFIG -ts recent',
+                    title=Title("Config change details"))
+        
+        # Perform backup
+        self.logger.info("Configuration change backup triggered")
+        # Without a stored base checkpoint the burst's changes are unknown, so
+        # a full backup is taken even in diff mode
+        diff_base = stored_checkpoint if self._cfg['change_backup_mode'] == 'diff' else None
+        self.perform_backup('config_change', diff_base)
+
+    def perform_backup(self, backup_type, diff_base=None):
         """
         Perform the actual TFTP backup operation.
         
@@ -261,10 +664,12 @@ class Agent(NAE):
         
         :param backup_type: Type of backup triggering this action 
                            ('weekly_scheduled' or 'config_change')
+        :param diff_base: Checkpoint to back up the diff against, or None
+                          to back up the full running configuration
         """
         try:
             # Validate TFTP server address
-            tftp_server = str(self.params['tftp_server_address']).strip()
+            tftp_server = self._cfg['tftp_server']
             if not tftp_server:
                 self.logger.error("TFTP server address not configured")
                 ActionSyslog(f"{backup_type} backup failed: TFTP server not configured", 
@@ -272,25 +677,17 @@ class Agent(NAE):
                 return
             
             # Validate filename prefix
-            file_prefix = str(self.params['file_name_prefix']).strip()
+            file_prefix = self._cfg['prefix']
             if not file_prefix:
                 self.logger.error("Filename prefix not configured")
                 ActionSyslog(f"{backup_type} backup failed: Filename prefix not configured",
                            severity='WARNING')
                 return
             
-            # Get and validate format
-            config_format = str(self.params['tftp_configuration_format']).strip().lower()
-            if config_format not in ('json', 'cli'):
-                self.logger.warning(f"Invalid format '{config_format}', using 'json'")
-                config_format = 'json'
-            
-            # Get VRF
-            vrf = str(self.params['tftp_server_vrf']).strip()
-            
             # Execute backup
             self.logger.info(f"Starting {backup_type} backup to TFTP server {tftp_server}")
-            self._tftp_copy(tftp_server, file_prefix, vrf, config_format, backup_type)
+            self._tftp_copy(tftp_server, file_prefix, self._cfg['vrf'], self._cfg['fmt'],
+                            backup_type, self._cfg['blocksize'], self._cfg['compress'], diff_base)
             
             ActionSyslog(f"{backup_type} configuration backup completed to {tftp_server}",
                        severity='INFO')
@@ -299,7 +696,8 @@ class Agent(NAE):
             self.logger.error(f"Backup failed: {e}")
             ActionSyslog(f"{backup_type} backup failed: {e}", severity='ERR')
 
-    def _tftp_copy(self, tftp_server, file_prefix, vrf, config_format, backup_type):
+    def _tftp_copy(self, tftp_server, file_prefix, vrf, config_format, backup_type, blocksize,
+                   compress, diff_base=None):
         """
         Execute the TFTP copy command.
         
@@ -308,38 +706,34 @@ class Agent(NAE):
         :param vrf: VRF name to reach the TFTP server
         :param config_format: Format for backup (json or cli)
         :param backup_type: Type of backup for filename tagging
+        :param blocksize: TFTP block size in bytes, 0 for the copy command default
+        :param compress: True to gzip the backup before sending it
+        :param diff_base: Checkpoint to back up the diff against, or None
         """
+        if diff_base:
+            # Send only the changes since the base checkpoint
+            file_extension = '.diff.txt.gz' if compress else '.diff.txt'
+            filename = timestamped_filename(file_prefix, f'{backup_type}-', file_extension,
+                                            next(self._seq))
+            diff_command = shlex.quote(f'checkpoint diff {diff_base} running-config')
+            tftp_command = stream_to_tftp(f'vtysh -c {diff_command}', tftp_server, filename,
+                                          vrf, blocksize, compress)
+            
+            self.logger.info(f"Executing: {tftp_command}")
+            ActionShell(tftp_command)
+            return
+        
         # Generate timestamped filename with backup type
-        timestamp = int(time.time())
         file_extension = '.json' if config_format == 'json' else '.cfg'
-        filename = f"{file_prefix}{backup_type}-{timestamp}{file_extension}"
-        
-        # Build TFTP command
-        tftp_command = f'copy running-config tftp://{tftp_server}/{filename} {config_format}'
-        
-        if vrf:
-            tftp_command += f' vrf {vrf}'
+        if compress:
+            file_extension += '.gz'
+        filename = timestamped_filename(file_prefix, f'{backup_type}-', file_extension,
+                                        next(self._seq))
+        tftp_command, is_shell = build_tftp_command(tftp_server, filename, config_format,
+                                                    vrf, blocksize, compress)
         
         self.logger.info(f"Executing: {tftp_command}")
-        ActionCLI(tftp_command)
-
-    def _is_valid_time_format(self, time_str):
-        """
-        Validate time string is in HH:MM:SS format.
-        
-        :param time_str: Time string to validate
-        :return: True if valid, False otherwise
-        """
-        try:
-            parts = time_str.split(':')
-            if len(parts) != 3:
-                return False
-            
-            hour, minute, second = map(int, parts)
-            
-            if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 59):
-                return False
-            
-            return True
-        except (ValueError, AttributeError):
-            return False
\ No newline at end of file
+        if is_shell:
+            ActionShell(tftp_command)
+        else:
+            ActionCLI(tftp_command)
\ No newline at end of file
@@ -17,17 +17,35 @@ Parameters:
     - tftp_server_vrf: VRF to reach the TFTP server (default: mgmt)
     - tftp_configuration_format: Format for backup (cli or json, default: json)
     - file_name_prefix: Prefix for backup filename (timestamp will be appended)
+    - tftp_blocksize: TFTP block size in bytes (0 uses the copy command default)
+    - compress_backup: Gzip the backup before sending it (true/false, default: false)
     - backup_day_of_week: Day of week for backup (Monday, Tuesday, etc.)
     - backup_time: Time of day for backup in HH:MM:SS format (default: 02:30:00)
 """
 
+import re
+import shlex
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# Map day names to numbers (0=Monday, 6=Sunday)
+DAY_MAP = {
+    'monday': 0,
+    'tuesday': 1,
+    'wednesday': 2,
+    'thursday': 3,
+    'friday': 4,
+    'saturday': 5,
+    'sunday': 6
+}
+
+# Time of day in HH:MM:SS (24-hour) format
+_TIME_RE = re.compile(r'\A(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]\Z')
 
 Manifest = {
     'Name': 'weekly_tftp_backup',
     'Description': 'Backs up switch configuration to TFTP server weekly on scheduled day/time',
-    'Version': '1.5',
+    'Version': '1.7',
     'Author': 'Matthew Stegink',
     'AOSCXVersionMin': '10.08',
     'AOSCXPlatformList': ['8320', '8325', '8400', '6300', '6200']
@@ -58,6 +76,22 @@ ParameterDefinitions = {
         'Type': 'string',
         'Default': 'switch-backup-'
     },
+    'tftp_blocksize': {
+        'Name': 'TFTP Block Size',
+        'Description': 'TFTP block size in bytes (512-65464) negotiated with the server; '
+                       'larger blocks need fewer round trips on high-latency links. '
+                       '0 uses the copy command, which always sends 512 byte blocks',
+        'Type': 'string',
+        'Default': '0'
+    },
+    'compress_backup': {
+        'Name': 'Compress Backup',
+        'Description': 'Gzip the backup before sending it (true or false). Fewer TFTP blocks '
+                       'means fewer round trips on high-latency links; the file gets a .gz '
+                       'extension',
+        'Type': 'string',
+        'Default': 'false'
+    },
     'backup_day_of_week': {
         'Name': 'Backup Day of Week',
         'Description': 'Day of week for backup (Monday, Tuesday, Wednesday, Thursday, Friday, Saturday, Sunday)',
@@ -73,6 +107,119 @@ ParameterDefinitions = {
 }
 
 
+# Helpers shared by the TFTP backup scripts. NAE scripts are uploaded as
+# single files and cannot import each other, so keep these identical in
+# every backup script.
+
+def is_valid_time(time_str):
+    """
+    Validate time string is in HH:MM:SS format.
+    
+    :param time_str: Time string to validate
+    :return: True if valid, False otherwise
+    """
+    return _TIME_RE.match(time_str) is not None
+
+
+def timestamped_filename(file_prefix, tag, file_extension, sequence=None):
+    """
+    Build a timestamped backup filename.
+    
+    :param file_prefix: Prefix for the backup filename
+    :param tag: Text inserted between the prefix and the timestamp
+    :param file_extension: Extension appended after the timestamp (e.g. .json)
+    :param sequence: Optional number appended to the timestamp, keeping
+                     filenames of backups taken in the same second unique
+    :return: Filename such as <prefix><tag><timestamp>[-<sequence>].json
+    """
+    timestamp = int(time.time())
+    if sequence is not None:
+        return f"{file_prefix}{tag}{timestamp}-{sequence}{file_extension}"
+    return f"{file_prefix}{tag}{timestamp}{file_extension}"
+
+
+def build_tftp_command(tftp_server, filename, config_format, vrf, blocksize, compress):
+    """
+    Build the command that copies the running configuration to TFTP.
+    
+    :param tftp_server: IP address or hostname of TFTP server
+    :param filename: Backup filename on the TFTP server
+    :param config_format: Format for backup (json or cli)
+    :param vrf: VRF name to reach the TFTP server
+    :param blocksize: TFTP block size in bytes, 0 for the copy command default
+    :param compress: True to gzip the configuration before sending it
+    :return: Tuple of (command, True if it is a shell command, False if CLI)
+    """
+    if blocksize or compress:
+        # The copy command can neither negotiate the block size (RFC 2348)
+        # nor compress, so stream the configuration to the server with curl
+        show_command = 'show running-config json' if config_format == 'json' else 'show running-config'
+        return stream_to_tftp(f'vtysh -c "{show_command}"', tftp_server, filename, vrf,
+                              blocksize, compress), True
+    
+    tftp_command = f'copy running-config tftp://{tftp_server}/{filename} {config_format}'
+    
+    if vrf:
+        tftp_command += f' vrf {vrf}'
+    
+    return tftp_command, False
+
+
+def stream_to_tftp(source_cmd, tftp_server, filename, vrf, blocksize, compress):
+    """
+    Build a shell command that uploads the output of a command to TFTP.
+    
+    :param source_cmd: Shell command writing the backup contents to standard output
+    :param tftp_server: IP address or hostname of TFTP server
+    :param filename: Backup filename on the TFTP server
+    :param vrf: VRF name to reach the TFTP server
+    :param blocksize: TFTP block size in bytes, 0 for the curl default
+    :param compress: True to gzip the output before sending it
+    :return: Shell command piping the output of source_cmd to the server
+    """
+    command = f'{source_cmd} | '
+    
+    if compress:
+        # Fastest level keeps CPU usage low on smaller platforms
+        command += 'gzip -1 | '
+    
+    return command + curl_tftp_upload(tftp_server, filename, vrf, blocksize)
+
+
+def curl_tftp_upload(tftp_server, filename, vrf, blocksize):
+    """
+    Build a shell command that uploads its standard input to TFTP with curl.
+    
+    :param tftp_server: IP address or hostname of TFTP server
+    :param filename: Backup filename on the TFTP server
+    :param vrf: VRF name to reach the TFTP server
+    :param blocksize: TFTP block size in bytes, 0 for the curl default
+    :return: Shell command reading the file contents from standard input
+    """
+    command = f'{netns_prefix(vrf)}curl -s -S '
+    
+    if blocksize:
+        command += f'--tftp-blksize {blocksize} '
+    
+    # Parameter values are quoted so they cannot break out of the command
+    return command + '-T - ' + shlex.quote(f'tftp://{tftp_server}/{filename}')
+
+
+def netns_prefix(vrf):
+    """
+    Build the shell prefix that runs a command inside a VRF.
+    
+    :param vrf: VRF name to reach the TFTP server
+    :return: 'ip netns exec' prefix, or an empty string if no VRF is set
+    """
+    if not vrf:
+        return ''
+    
+    # The default VRF lives in the switch namespace
+    namespace = 'swns' if vrf == 'default' else vrf
+    return f'ip netns exec {shlex.quote(namespace)} '
+
+
 class Agent(NAE):
     """
     NAE Agent for weekly scheduled TFTP backups.
@@ -82,20 +229,19 @@ class Agent(NAE):
     per week.
     """
     
-    # Map day names to numbers (0=Monday, 6=Sunday)
-    DAY_MAP = {
-        'monday': 0,
-        'tuesday': 1,
-        'wednesday': 2,
-        'thursday': 3,
-        'friday': 4,
-        'saturday': 5,
-        'sunday': 6
-    }
+    # Interval between two weekly backups
+    BACKUP_INTERVAL = timedelta(days=7)
     
     def __init__(self):
         """Initialize the weekly scheduled backup agent."""
-        # Create a rule that checks every 60 seconds
+        # Normalize the parameters once rather than on every backup
+        self._reload_config_params()
+        
+        # Parse the weekly schedule once and compute the next backup time
+        self._reload_schedule_params()
+        
+        # Create a rule that checks every 60 seconds whether the precomputed
+        # backup time has been reached
         self.schedule_rule = Rule('Weekly Backup Check')
         self.schedule_rule.condition('every 60 seconds')
         self.schedule_rule.action(self.check_backup_schedule)
@@ -106,48 +252,163 @@ class Agent(NAE):
         """
         Check if it's time to run the weekly backup.
         
-        This method is called every 60 seconds. It checks if today is the 
-        scheduled day, if the current time has passed the scheduled backup 
-        time, and if a backup hasn't already been performed this week.
+        This method is called every 60 seconds. The scheduled day and time are
+        parsed once at startup, so each check only compares the current Unix
+        time against the precomputed next backup timestamp. After a backup the next
+        backup time is advanced by one week from the scheduled time itself,
+        so late checks never make the schedule drift.
         
         :param event: Event details passed by the NAE agent
         """
         try:
-            current_datetime = datetime.now()
-            current_time = current_datetime.strftime("%H:%M:%S")
-            current_day = current_datetime.weekday()  # 0=Monday, 6=Sunday
-            current_week = current_datetime.strftime('%Y-W%U')  # Year-Week number
-            
-            # Get and validate scheduled day
-            scheduled_day_name = str(self.params['backup_day_of_week']).strip().lower()
-            if scheduled_day_name not in self.DAY_MAP:
-                self.logger.error(f"Invalid day: {scheduled_day_name}. Use Monday-Sunday")
+            if self._next_backup_ts is None or time.time() < self._next_backup_ts:
                 return
             
-            scheduled_day = self.DAY_MAP[scheduled_day_name]
-            
-            # Get and validate scheduled time
-            scheduled_time = str(self.params['backup_time']).strip()
-            if not self._is_valid_time_format(scheduled_time):
-                self.logger.error(f"Invalid time format: {scheduled_time}. Use HH:MM:SS")
-                return
+            current_datetime = datetime.now()
+            backup_time = self.next_backup_time
             
-            # Check if backup already ran this week
-            last_backup_week = self.variables.get('last_backup_week', '')
+            # Advance to the next slot in the future, skipping any slots that
+            # were missed (e.g. after a clock change)
+            next_backup_time = backup_time
+            while next_backup_time <= current_datetime:
+                next_backup_time += self.BACKUP_INTERVAL
+            self._set_next_backup_time(next_backup_time)
             
-            # If today is the scheduled day, time has passed, and we haven't backed up this week
-            if (current_day == scheduled_day and 
-                current_time >= scheduled_time and 
-                last_backup_week != current_week):
-                
-                day_name = scheduled_day_name.capitalize()
-                self.logger.info(f"Weekly backup triggered on {day_name} at {current_time}")
-                self.perform_backup()
-                self.variables['last_backup_week'] = current_week
+            day_name = backup_time.strftime('%A')
+            current_time = current_datetime.strftime("%H:%M:%S")
+            self.logger.info(f"Weekly backup triggered on {day_name} at {current_time}")
+            self.perform_backup()
+            self.variables['last_backup_week'] = str(self._backup_week(backup_time))
                 
         except Exception as e:
             self.logger.error(f"Error in check_backup_schedule: {e}")
 
+    def on_parameter_change(self, params):
+        """
+        Re-parse the parameters and weekly schedule when they are edited.
+        
+        :param params: Changed parameters passed by the NAE agent
+        """
+        self.logger.info("Parameters changed, reloading configuration")
+        self._reload_config_params()
+        self._reload_schedule_params()
+
+    def _reload_config_params(self):
+        """
+        Normalize and cache the backup parameters in self._cfg.
+        
+        Invalid values are replaced by their defaults with a warning; a
+        missing TFTP server or filename prefix is reported when a backup
+        is attempted.
+        """
+        # Get and validate format
+        config_format = str(self.params['tftp_configuration_format']).strip().lower()
+        if config_format not in ('json', 'cli'):
+            self.logger.warning(f"Invalid format '{config_format}', using 'json'")
+            config_format = 'json'
+        
+        # Get and validate TFTP block size
+        blocksize = str(self.params['tftp_blocksize']).strip()
+        if not blocksize.isdigit() or not (int(blocksize) == 0 or 512 <= int(blocksize) <= 65464):
+            self.logger.warning(f"Invalid TFTP block size '{blocksize}', using default")
+            blocksize = '0'
+        
+        self._cfg = {
+            'tftp_server': str(self.params['tftp_server_address']).strip(),
+            'vrf': str(self.params['tftp_server_vrf']).strip(),
+            'fmt': config_format,
+            'prefix': str(self.params['file_name_prefix']).strip(),
+            'blocksize': int(blocksize),
+            'compress': str(self.params['compress_backup']).strip().lower() == 'true'
+        }
+
+    def _reload_schedule_params(self):
+        """
+        Parse and cache the weekly schedule parameters.
+        
+        The scheduled weekday and the scheduled time as seconds of the day
+        are cached so the periodic check never touches the parameters. If
+        either parameter is invalid the weekly backup is disabled until the
+        parameters are corrected.
+        """
+        self._sched_weekday = None
+        self._sched_sod = None
+        self._set_next_backup_time(None)
+        
+        # Get and validate scheduled day
+        scheduled_day_name = str(self.params['backup_day_of_week']).strip().lower()
+        if scheduled_day_name not in DAY_MAP:
+            self.logger.error(f"Invalid day: {scheduled_day_name}. Use Monday-Sunday")
+            return
+        
+        # Get and validate scheduled time
+        scheduled_time = str(self.params['backup_time']).strip()
+        if not is_valid_time(scheduled_time):
+            self.logger.error(f"Invalid time format: {scheduled_time}. Use HH:MM:SS")
+            return
+        
+        hour, minute, second = map(int, scheduled_time.split(':'))
+        
+        self._sched_weekday = DAY_MAP[scheduled_day_name]
+        self._sched_sod = hour * 3600 + minute * 60 + second
+        self._set_next_backup_time(self._compute_first_backup_time())
+        self.logger.info(f"Next weekly backup scheduled for {self.next_backup_time}")
+
+    def _set_next_backup_time(self, next_backup_time):
+        """
+        Set the next backup time.
+        
+        The time is also kept as a Unix timestamp so the periodic check only
+        needs time.time() instead of building a datetime on every call.
+        Slots are advanced on the local datetime, keeping the wall-clock time
+        stable across daylight saving changes.
+        
+        :param next_backup_time: datetime of the next backup, or None
+        """
+        self.next_backup_time = next_backup_time
+        if next_backup_time is None:
+            self._next_backup_ts = None
+        else:
+            self._next_backup_ts = time.mktime(next_backup_time.timetuple())
+
+    def _compute_first_backup_time(self):
+        """
+        Compute the first backup time from the cached schedule.
+        
+        If today is the scheduled day and the scheduled time has already
+        passed without a backup this week, the backup is due immediately.
+        
+        :return: datetime of the next backup
+        """
+        current_datetime = datetime.now()
+        days_ahead = (self._sched_weekday - current_datetime.weekday()) % 7
+        midnight = current_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
+        next_backup_time = midnight + timedelta(days=days_ahead, seconds=self._sched_sod)
+        
+        # Scheduled time already passed today - only run it if this week's
+        # backup hasn't been performed yet (e.g. agent restarted)
+        if next_backup_time <= current_datetime:
+            last_backup_week = self.variables.get('last_backup_week', '')
+            if last_backup_week.isdigit():
+                already_done = int(last_backup_week) == self._backup_week(next_backup_time)
+            else:
+                # Week marker written by a previous version of this script
+                already_done = last_backup_week == next_backup_time.strftime('%Y-W%U')
+            if already_done:
+                next_backup_time += self.BACKUP_INTERVAL
+        
+        return next_backup_time
+
+    def _backup_week(self, backup_time):
+        """
+        Get the ISO week of a backup time packed as an integer.
+        
+        :param backup_time: datetime of the backup
+        :return: Year and ISO week number as YYYYWW (e.g. 202641)
+        """
+        year, week, _ = backup_time.isocalendar()
+        return year * 100 + week
+
     def perform_backup(self):
         """
         Perform the actual TFTP backup operation.
@@ -157,7 +418,7 @@ class Agent(NAE):
         """
         try:
             # Validate TFTP server address
-            tftp_server = str(self.params['tftp_server_address']).strip()
+            tftp_server = self._cfg['tftp_server']
             if not tftp_server:
                 self.logger.error("TFTP server address not configured")
                 ActionSyslog("Weekly backup failed: TFTP server not configured", 
@@ -165,25 +426,17 @@ class Agent(NAE):
                 return
             
             # Validate filename prefix
-            file_prefix = str(self.params['file_name_prefix']).strip()
+            file_prefix = self._cfg['prefix']
             if not file_prefix:
                 self.logger.error("Filename prefix not configured")
                 ActionSyslog("Weekly backup failed: Filename prefix not configured",
                            severity='WARNING')
                 return
             
-            # Get and validate format
-            config_format = str(self.params['tftp_configuration_format']).strip().lower()
-            if config_format not in ('json', 'cli'):
-                self.logger.warning(f"Invalid format '{config_format}', using 'json'")
-                config_format = 'json'
-            
-            # Get VRF
-            vrf = str(self.params['tftp_server_vrf']).strip()
-            
             # Execute backup
             self.logger.info(f"Starting weekly backup to TFTP server {tftp_server}")
-            self._tftp_copy(tftp_server, file_prefix, vrf, config_format)
+            self._tftp_copy(tftp_server, file_prefix, self._cfg['vrf'], self._cfg['fmt'],
+                            self._cfg['blocksize'], self._cfg['compress'])
             
             ActionSyslog(f"Weekly configuration backup completed to {tftp_server}",
                        severity='INFO')
@@ -192,7 +445,7 @@ class Agent(NAE):
             self.logger.error(f"Backup failed: {e}")
             ActionSyslog(f"Weekly backup failed: {e}", severity='ERR')
 
-    def _tftp_copy(self, tftp_server, file_prefix, vrf, config_format):
+    def _tftp_copy(self, tftp_server, file_prefix, vrf, config_format, blocksize, compress):
         """
         Execute the TFTP copy command.
         
@@ -200,38 +453,19 @@ class Agent(NAE):
         :param file_prefix: Prefix for the backup filename
         :param vrf: VRF name to reach the TFTP server
         :param config_format: Format for backup (json or cli)
+        :param blocksize: TFTP block size in bytes, 0 for the copy command default
+        :param compress: True to gzip the backup before sending it
         """
         # Generate timestamped filename
-        timestamp = int(time.time())
         file_extension = '.json' if config_format == 'json' else '.cfg'
-        filename = f"{file_prefix}{timestamp}{file_extension}"
-        
-        # Build TFTP command
-        tftp_command = f'copy running-config tftp://{tftp_server}/{filename} {config_format}'
-        
-        if vrf:
-            tftp_command += f' vrf {vrf}'
+        if compress:
+            file_extension += '.gz'
+        filename = timestamped_filename(file_prefix, '', file_extension)
+        tftp_command, is_shell = build_tftp_command(tftp_server, filename, config_format,
+                                                    vrf, blocksize, compress)
         
         self.logger.info(f"Executing: {tftp_command}")
-        ActionCLI(tftp_command)
-
-    def _is_valid_time_format(self, time_str):
-        """
-        Validate time string is in HH:MM:SS format.
-        
-        :param time_str: Time string to validate
-        :return: True if valid, False otherwise
-        """
-        try:
-            parts = time_str.split(':')
-            if len(parts) != 3:
-                return False
-            
-            hour, minute, second = map(int, parts)
-            
-            if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 59):
-                return False
-            
-            return True
-        except (ValueError, AttributeError):
-            return False
+        if is_shell:
+            ActionShell(tftp_command)
+        else:
+            ActionCLI(tftp_command)